@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 '''
 python wrapper to make using PV5 more tolerable
 
@@ -25,27 +25,75 @@ etc.  Attributes to the object are the method's parameters.
 
 import os
 import time
+import select
+import numbers
 import logging
+import threading
 import subprocess
+import collections
+from functools import cached_property
+from shlex import quote as shquote
+from concurrent.futures import ThreadPoolExecutor
 
 def is_exe(fpath):
     ''' helper function '''
     return os.path.isfile(fpath) and os.access(fpath, os.X_OK)
 
+# subdirectory listings, so checking that a dataset exists doesn't stat every
+# time; least recently used first, at most _LISTDIRS_MAX of them
+_listdirs = collections.OrderedDict()
+_LISTDIRS_MAX = 256
+
+def _listdir_set(parent, refresh=False):
+    ''' cached set of the subdirectories of directory 'parent' '''
+    if refresh or parent not in _listdirs:
+        try:
+            _listdirs[parent] = frozenset(e.name for e in os.scandir(parent) if e.is_dir())
+        except OSError:
+            _listdirs[parent] = frozenset()
+        if len(_listdirs) > _LISTDIRS_MAX:
+            _listdirs.popitem(last=False)
+    _listdirs.move_to_end(parent)
+    return _listdirs[parent]
+
+def _forget_listdirs():
+    ''' drop all cached directory listings, after datasets are created/deleted '''
+    _listdirs.clear()
+
+def path_isdir(path):
+    ''' like os.path.isdir(), but with cached listings of the parent directory '''
+    parent, name = os.path.split(path.rstrip('/'))
+    parent = parent or '.'
+    if name in _listdir_set(parent):
+        return True
+    # a miss may just be a stale listing
+    if os.path.isdir(path):
+        _listdir_set(parent, refresh=True)
+        return True
+    return False
+
 def is_int(s):
-    try:
-        int(s)
+    ''' is s an int, or a string of one - without int()'s try/except '''
+    if isinstance(s, numbers.Integral):
         return True
-    except:
-        return False
+    if isinstance(s, str):
+        # one optional sign, then ascii/decimal digits, as int() takes them
+        t = s.strip()
+        t = t[1:] if t[:1] in ('+', '-') else t
+        return t.isdecimal()
+    return False
+
 
+# attributes that introspection tools (IPython, pickle, ...) look for on any
+# object, which can't be PV parameters and shouldn't go to pvcmd
+_PROBE_ATTRS = frozenset(['trait_names', 'getdoc'])
 
 class PvObj(object):
     ''' class that wraps a single PV dataset & its recons
     
     Attributes are proxys for the method's variables, and can be set and read:
 
-    print o.RG
+    print(o.RG)
     o.RG = 110
 
     Other things can be done with it too:
@@ -56,19 +104,28 @@ class PvObj(object):
 
     '''
 
+    # no per-instance __dict__: GetObjList can make a lot of these
+    __slots__ = ('_objpath', '_pvScan', '_exp_path', '_study_path', 'log')
+
     def __init__(self, objpath, pvScan):
         # make sure it's a pv
         if not isinstance(pvScan, PvScan):
             raise ValueError("PvObj(): pvScan must be a PvScan object")
         # verify that the objpath is reasonable
-        if not os.path.isdir(objpath):
-            raise AttributeError("invalid object path: '%s'" % (objpath))
-        #if not os.path.isfile(objpath + '/../../acqp'):
-        #    print os.path.isdir(objpath),os.path.isfile(objpath + '/../../acqp')
-        #    raise AttributeError("invalid object path no acqp: '%s'".format(objpath))
-        self.__dict__['_objpath'] = objpath
-        self.__dict__['_pvScan'] = pvScan
-        self.__dict__['log'] = logging.getLogger('PvObj[%s]' % objpath)
+        if not path_isdir(objpath):
+            raise AttributeError(f"invalid object path: '{objpath}'")
+        # (our __setattr__ sets PV parameters, so go around it)
+        object.__setattr__(self, '_objpath', objpath)
+        # objpath is <study>/<expno>/pdata/<procno>, and never changes
+        parts = objpath.rstrip('/').split('/')
+        object.__setattr__(self, '_exp_path', '/'.join(parts[0:-2]))
+        object.__setattr__(self, '_study_path', '/'.join(parts[0:-3]))
+        object.__setattr__(self, '_pvScan', pvScan)
+        object.__setattr__(self, 'log', logging.getLogger(f'PvObj[{objpath}]'))
+
+    def __reduce__(self):
+        # copy/pickle would restore the slots through __setattr__
+        return (PvObj, (self._objpath, self._pvScan))
 
     def __str__(self):
         return self._objpath
@@ -77,13 +134,13 @@ class PvObj(object):
         return '{' + self._objpath + '}'
 
     def __setattr__(self, name, value):
-        if name[0:2] == '__':
-            raise NotImplementedError
+        if name.startswith('_') or name in _PROBE_ATTRS or name in PvObj.__slots__:
+            raise AttributeError(name)
         self.SetParam(name, value)
 
     def __getattr__(self, name):
-        if name[0:2] == '__':
-            raise NotImplementedError
+        if name.startswith('_') or name in _PROBE_ATTRS or name in PvObj.__slots__:
+            raise AttributeError(name)
         return self.GetParam(name)
 
     def __eq__(self, other):
@@ -91,6 +148,9 @@ class PvObj(object):
             return self._objpath == other._objpath
         return NotImplemented
 
+    def __hash__(self):
+        return hash(self._objpath)
+
     def __ne__(self, other):
         result = self.__eq__(other)
         if result is NotImplemented:
@@ -98,8 +158,15 @@ class PvObj(object):
         return not result
 
     def GetParam(self, name):
+        key = (self._objpath, name)
+        cache = self._pvScan._param_cache
+        if key in cache:
+            return pythify(cache[key])
         self._pvScan.SetObj(self)
-        return self._pvScan.GetParam(name)
+        val = self._pvScan._GetRaw(name)
+        if name not in _VOLATILE_PARAMS:
+            cache[key] = val
+        return pythify(val)
 
     def SetParam(self, name, value):
         self._pvScan.SetObj(self)
@@ -111,11 +178,11 @@ class PvObj(object):
 
     def StudyPath(self):
         ''' the path to the object's study '''
-        return '/'.join(self._objpath.split('/')[0:-3])
+        return self._study_path
 
     def ExpPath(self):
         ''' the path to the object's experiment '''
-        return '/'.join(self._objpath.split('/')[0:-2])
+        return self._exp_path
 
     def Clone(self):
         ''' clone the object described by pvobj, return the new PvObj '''
@@ -123,6 +190,7 @@ class PvObj(object):
         self._pvScan.SetObj(self)
         # maybe... ?   -procno <path> : prono path to clone. -- untested
         self._pvScan.Command('pvDsetClone', 'Scan', 'Current')
+        _forget_listdirs()
         return self._pvScan.GetObj()
 
     def CloneReco(self):
@@ -130,6 +198,7 @@ class PvObj(object):
         self.log.info('CloneReco')
         self._pvScan.SetObj(self)
         self._pvScan.Command('pvDsetClone', 'Reco', 'Current')
+        _forget_listdirs()
         #pvScan pvDsetCloneProcno -procno path 0
         return self._pvScan.GetObj()
 
@@ -151,11 +220,13 @@ class PvObj(object):
         self.log.info('Delete')
         self._pvScan.SetObj(self)
         self._pvScan.Command('pvDsetDel', 'Scan', 'Current', '-Control', '-Alt')
+        _forget_listdirs()
 
     def DeleteReco(self):
         self.log.info('DeleteReco')
         self._pvScan.SetObj(self)
         self._pvScan.Command('pvDsetDel', 'Reco', 'Current', '-Control', '-Alt')
+        _forget_listdirs()
 
     # todo:
     # pvcmd -a pvScan pvStartGsp
@@ -184,13 +255,13 @@ class PvObj(object):
         'TRANSM' - reference transmitter gain
         from either category 'Standard' or 'Current'
         '''
-        self.log.info('Adjustment(%s,%s)' % (adjustment, category))
+        self.log.info(f'Adjustment({adjustment},{category})')
         if adjustment not in ['RCVR', 'FREQ', 'SHIM', 'TRANSM']:
             raise ValueError('Adjustment must be "RCVR", "FREQ", or "SHIM"')
         if category not in ['Standard', 'Current']:
             raise ValueError('Adjustment Category must be "Standard" or "Current"')
         self._pvScan.SetObj(self)
-        self._pvScan.Command('pvStartGsauto', '-cmd', adjustment+'_'+category)
+        self._pvScan.Command('pvStartGsauto', '-cmd', adjustment+'_'+category, sync=False)
         time.sleep(10)
         self._pvScan.Sync(self._objpath)
 
@@ -200,7 +271,7 @@ class PvObj(object):
         '''
         self.log.info('Start')
         self._pvScan.SetObj(self)
-        self._pvScan.Command('pvStartScan', '-Control', '-Alt')
+        self._pvScan.Command('pvStartScan', '-Control', '-Alt', sync=False)
         self._pvScan.Sync(self._objpath)
 
     def Stop(self):
@@ -212,8 +283,8 @@ class PvObj(object):
         '''
         self.log.info('Stop')
         #self._pvScan.Command('pvStopScan','-quiet')
-        self._pvScan.Command('pvStopMultiPipe')
-        self._pvScan.Command('pvStopPipe', self._objpath)
+        self._pvScan.Command('pvStopMultiPipe', sync=False)
+        self._pvScan.Command('pvStopPipe', self._objpath, sync=False)
         #self._pvScan.Command('pvStopScan')
         self._pvScan.Sync(self._objpath)
 
@@ -221,14 +292,14 @@ class PvObj(object):
         '''
         like clicking the GOP button in the Spectrometer Control Tool
         '''
-        self._pvScan.Command('pvStartGop', self._objpath, '-Control', '-Alt')
+        self._pvScan.Command('pvStartGop', self._objpath, '-Control', '-Alt', sync=False)
         self._pvScan.Sync(self._objpath)
 
     def Gsp(self):
         '''
         like clicking the GSP button in the Spectrometer Control Tool
         '''
-        self._pvScan.Command('pvStartGsp', self._objpath)
+        self._pvScan.Command('pvStartGsp', self._objpath, sync=False)
         self._pvScan.Sync(self._objpath)
 
     def Undo(self, what='Scan'):
@@ -272,9 +343,28 @@ def pythify(val):
         val = floatify(val)
     return val
 
+# an app Sync() this soon after the previous one, with no commands in
+# between, is skipped
+_SYNC_WINDOW = 0.01
+
+# parameters that change on their own (e.g. while a scan runs), never cached
+_VOLATILE_PARAMS = frozenset(['ACQ_status', 'ACQ_completed',
+                              'CONFIG_status_string', 'CONFIG_shim_status'])
+
+# commands that only query the app, and so leave cached parameters valid
+_QUERY_COMMANDS = ['pvDsetPath', 'pvDsetListScans', 'CmdList']
+# commands that change the selected object, but not any parameter values
+_SELECT_COMMANDS = ['pvDsetObjSel']
+
 class PvApp(object):
     '''
     wrapper around commands that need to have an app
+
+    parameter values read with GetParam are cached until the next SetParam
+    or state-changing Command, keyed by (app, param) - or by (objpath, param)
+    for values read through a PvObj.  Status parameters (_VOLATILE_PARAMS)
+    are always read fresh.  Anything changed outside this process, e.g. in
+    the ParaVision GUI, is only seen after FlushCache().
     '''
     def __init__(self, appname, pv=None):
         if pv != None and not isinstance(pv, PvCmd):
@@ -284,17 +374,51 @@ class PvApp(object):
         else:
             self.pv = PvCmd()
         self.app = appname
-        self.log = logging.getLogger('[%s]' % appname)
+        self._param_cache = {}
+        # time of the last Sync(), None if commands were sent since
+        self._last_sync = None
+        self.log = logging.getLogger(f'[{appname}]')
         #self.commands = self.Command('CmdList').split(' ')
 
+    def _GetRaw(self, param):
+        ''' the unconverted pvcmd reply for param, cached unless it's volatile '''
+        key = (self.app, param)
+        if key in self._param_cache:
+            return self._param_cache[key]
+        val = self.pv._run_pvcmd('-get', self.app, param)
+        if param not in _VOLATILE_PARAMS:
+            self._param_cache[key] = val
+        return val
+
     def GetParam(self, param):
         ''' '''
-        val = self.pv._run_pvcmd('-get', self.app, param)
-        val = pythify(val)
+        val = pythify(self._GetRaw(param))
         return val
 
+    def GetParams(self, params):
+        ''' get several parameters with a single pvcmd round trip, return a dict '''
+        return dict((p, pythify(v)) for p, v in self._GetRaws(params).items())
+
+    def _GetRaws(self, params):
+        ''' like GetParams, but the unconverted pvcmd replies '''
+        missing = [p for p in params if (self.app, p) not in self._param_cache]
+        if self.pv.concurrent and len(missing) > 1:
+            # -get doesn't change anything in PV, so the reads can overlap
+            futures = [self.pv._run_pvcmd_async('-get', self.app, p) for p in missing]
+            vals = [f.result() for f in futures]
+        else:
+            vals = self.pv._run_pvcmds([('-get', self.app, p) for p in missing])
+        fetched = dict(zip(missing, vals))
+        for param, val in fetched.items():
+            if param not in _VOLATILE_PARAMS:
+                self._param_cache[(self.app, param)] = val
+        return dict((p, fetched[p] if p in fetched else self._param_cache[(self.app, p)])
+                    for p in params)
+
     def SetParam(self, param, value):
         ''' '''
+        self._param_cache.clear()
+        self._last_sync = None
         self.pv._run_pvcmd('-set', self.app, param, str(value))
         #self.Sync()
 
@@ -302,33 +426,87 @@ class PvApp(object):
         ''' get a list of available parameters (maybe move to PvObj?) '''
         pass
 
+    def FlushCache(self):
+        ''' forget all cached parameter values '''
+        self._param_cache.clear()
+
+    def _Invalidate(self, cmd):
+        ''' forget the cached parameters that running cmd might change '''
+        if cmd and cmd[0] in _QUERY_COMMANDS:
+            return
+        if cmd and cmd[0] in _SELECT_COMMANDS:
+            # only the app's view of "the current object" moved
+            for key in [k for k in self._param_cache if k[0] == self.app]:
+                del self._param_cache[key]
+            return
+        self._param_cache.clear()
+
     def Sync(self, path=None):
-        ''' '''
-        self.log.info('Sync(%s)' % path)
-        self.pv._run_pvcmd('-s', self.app)
+        ''' wait for the app, and then for the dataset at 'path', to be idle '''
+        self.log.info(f'Sync({path})')
+        argvs = []
+        if (self._last_sync is None
+            or time.time() - self._last_sync > _SYNC_WINDOW):
+            argvs += [('-s', self.app)]
         if path:
-            self.pv._run_pvcmd('-s', path)
+            argvs += [('-s', path)]
+        self.pv._run_pvcmds(argvs)
+        self._last_sync = time.time()
+
+    def Command(self, *cmd, sync=True):
+        '''
+        send command to app, get results
 
-    def Command(self, *cmd):
-        ''' send command to app, get results '''
+        sync=False skips the Sync() afterwards, for callers that sync themselves
+        '''
+        self._Invalidate(cmd)
+        self._last_sync = None
         res = self.pv._run_pvcmd('-a', self.app, '-r', *cmd)
-        self.log.info('Command %s->%s' % (str(cmd), res))
-        self.Sync()
+        self.log.info(f'Command {cmd}->{res}')
+        if sync:
+            self.Sync()
         return res
 
-    def CommandQuiet(self, *cmd):
-        ''' send command to app, dont get results '''
-        self.log.info('CommandQuiet(%s)' % str(cmd))
+    def CommandQuiet(self, *cmd, sync=True):
+        ''' send command to app, dont get results (and see Command) '''
+        self.log.info(f'CommandQuiet({cmd})')
+        self._Invalidate(cmd)
+        self._last_sync = None
         res = self.pv._run_pvcmd('-a', self.app, *cmd)
-        self.Sync()
+        if sync:
+            self.Sync()
         return res
 
     def CommandList(self):
         return self.Command('CmdList')
 
+# pvDsetCreateStudy arguments:
+# -studyname <name> -subjectid <id> -name <name> -subjectname <name> [ -birthdate YYYYMMDD ]
+# [ -type (animal | human | other) ] [ -gender (f | m | u) ]
+# [ -remarks <remarks> ] ] [ -studyloc <location> ]
+# [ -coil <coil> ] [ -entry (FeetFirst | HeadFirst) ]
+# [ -position (Supine | Prone | Left | Right) ] [ -weight <weight> ]
+# [ -referral <referral> ] [ -purpose <purpose> ]
+_STUDY_KEYS = frozenset(['studyname', 'subjectid', 'subjectname', 'birthdate', 'type',
+                         'gender', 'remarks', 'name', 'studyloc', 'coil', 'entry',
+                         'position', 'weight', 'referral', 'purpose'])
+
 class PvScan(PvApp):
     def __init__(self, pv):
         super (PvScan, self).__init__('pvScan', pv)
+        # paths of the current selection, cached like the parameters:
+        # until the selection changes here, or FlushCache()
+        self._pathcache = {}
+
+    def FlushCache(self):
+        ''' forget all cached parameter values and paths '''
+        self._pathcache.clear()
+        super (PvScan, self).FlushCache()
+
+    def _Invalidate(self, cmd):
+        if not (cmd and cmd[0] in _QUERY_COMMANDS):
+            self._pathcache.clear()
+        super (PvScan, self)._Invalidate(cmd)
 
 #    def ExpPath(self):
 #        ''' get full current experiment path '''
@@ -340,14 +518,19 @@ class PvScan(PvApp):
 #    def ProcPath(self):
 #        return self.ExpPath() + '/' + self.GetParam('PROCNO')
 
+    def _Path(self, which):
+        if which not in self._pathcache:
+            self._pathcache[which] = self.Command('pvDsetPath', '-path', which)
+        return self._pathcache[which]
+
     def StudyPath(self):
-        return self.Command('pvDsetPath', '-path', 'STUDY')
+        return self._Path('STUDY')
 
     def ExpPath(self):
-        return self.Command('pvDsetPath', '-path', 'EXPNO')
+        return self._Path('EXPNO')
 
     def ProcPath(self):
-        return self.Command('pvDsetPath', '-path', 'PROCNO')
+        return self._Path('PROCNO')
 
     def Popup(self, message):
         return self.Command('pvErrorAlert', 'Python', message)
@@ -364,23 +547,26 @@ class PvScan(PvApp):
         '''
         self.Command('CprNoWait','setdef','ackn','ok')
 
+    def _ExpnoPath(self, expno):
+        ''' path to the first reco of 'expno' in the current study '''
+        # raw replies: pythify would turn a NAME like '007' into 7
+        p = self._GetRaws(['DU', 'USER', 'NAME'])
+        return f"{p['DU']}/data/{p['USER']}/nmr/{p['NAME']}/{expno}/pdata/1"
+
     def SetObj(self, pvobj):
         ''' set the currently selected object to pvobj '''
-        self.log.debug('SetObj(%s)' % pvobj)
+        self.log.debug(f'SetObj({pvobj})')
         if is_int(pvobj):
             # just change the EXPNO
-            newdir = self.GetParam('DU') + '/data/' + \
-                     self.GetParam('USER') + '/nmr/' + \
-                     self.GetParam('NAME') + '/' + \
-                     str(pvobj) + '/pdata/1'
-            if os.path.isdir(newdir):
+            newdir = self._ExpnoPath(pvobj)
+            if path_isdir(newdir):
                 pvobj = newdir
                 # TODO: this doesn't work  like this - actually
                 #       it goes to a 0-based index in the scan list(!)
                 #
                 #self.CommandQuiet('pvDsetSsel', str(pvobj))
             else:
-                raise ValueError('PvCmd::SetObj: invalid (empty) expno:'+str(pvobj))
+                raise ValueError(f'PvCmd::SetObj: invalid (empty) expno:{pvobj}')
         #self.CommandQuiet('pvDsetSsel', str(pvobj))
         self.CommandQuiet('pvDsetObjSel', str(pvobj))
 
@@ -397,74 +583,136 @@ class PvScan(PvApp):
 
     def GetObj(self, index=None, restore=True):
         ''' get the currently selected object, or the object at the numerical 'index' '''
-        self.log.info('GetObj(%s,%s)' % (index, restore))
+        self.log.info(f'GetObj({index},{restore})')
         if index:
             if restore:
                 oldobj = self.ProcPath()
             self.SetObj(index)
+        # ask once, the selection is the same for the rest of this call
+        procpath = self.ProcPath()
         try:
-            pvobj = PvObj(self.ProcPath(), self)
+            pvobj = PvObj(procpath, self)
         except:
-            self.log.warn('GetObj: unable to get obj at (%s)' % (self.ProcPath()))
+            self.log.warning(f'GetObj: unable to get obj at ({procpath})')
             pvobj = None
         if index and restore:
             self.SetObj(oldobj)
         return pvobj
 
+    def _ObjEntry(self, pvo, method):
+        ''' a GetObjList entry, priming the cache with the raw 'method' reply '''
+        # the expno, so it can be passed straight to SetObj()/GetObj()
+        expno = os.path.basename(pvo.ExpPath())
+        if is_int(expno):
+            expno = int(expno)
+        if method is None:
+            return (expno, pvo, '')
+        # so pvo.Method doesn't go back to pvcmd
+        self._param_cache[(pvo._objpath, 'Method')] = method
+        return (expno, pvo, pythify(method))
+
+    def _ListScans(self):
+        ''' paths to the (first) reco of every scan in the scan list '''
+        # not through Command: a PV without ByPath listing is expected here,
+        # and _run_pvcmds would report the failure before the caller falls back
+        self._last_sync = None
+        scans = self.pv._run_pvcmds([('-a', self.app, '-r', 'pvDsetListScans', 'ByPath')],
+                                    strict=False)[0]
+        self.Sync()
+        if scans is None:
+            raise ValueError('pvDsetListScans ByPath rejected')
+        paths = []
+        for line in scans.lines:
+            path = line.strip().rstrip('/')
+            if '/pdata/' not in path:
+                path += '/pdata/1'
+            if not path_isdir(path):
+                raise ValueError(f'pvDsetListScans: not a dataset: {line}')
+            paths.append(path)
+        return paths
+
     def GetObjList(self):
-        ''' return a list of all objecs in the object list '''
-        ''' doens't really work '''
+        ''' return a list of (expno, PvObj, method) for all objects in the scan list '''
         self.log.info('GetObjList')
+        try:
+            paths = self._ListScans()
+        except ValueError as ex:
+            self.log.info(f'GetObjList: no usable scan list ({ex}), probing expnos')
+            return self._ProbeObjList()
+        selection = self.GetObj()
+        # the methods still need each object selected, but in one round trip
+        argvs = []
+        for path in paths:
+            argvs += [('-a', self.app, 'pvDsetObjSel', path),
+                      ('-s', self.app),
+                      ('-get', self.app, 'Method')]
+        self._Invalidate(['pvDsetObjSel'])
+        res = self.pv._run_pvcmds(argvs, strict=False)
+        pvobjlist = []
+        for index, path in enumerate(paths):
+            selected, synced, method = res[3*index:3*index+3]
+            if selected is None or synced is None:
+                # the Method read was of whatever object was still selected
+                method = None
+            pvobjlist.append(self._ObjEntry(PvObj(path, self), method))
+        if selection:
+            self.SetObj(selection)
+        return pvobjlist
+
+    def _ProbeObjList(self):
+        ''' GetObjList by selecting expnos one by one, doens't really work '''
         pvobjlist = []
-        index = 0
-        seen = []
+        seen = set()
         selection = self.GetObj()
-        for index in range(0,100):
+        # index 0 is the current selection, then the expnos 1,2,... that exist
+        paths = [selection and selection.ProcPath()]
+        for index in range(1,100):
+            try:
+                path = self._ExpnoPath(index)
+            except Exception as ex:
+                print(f'GetObjList error {ex}')
+                break
+            if not path_isdir(path):
+                break
+            paths += [path]
+        # select each one and read back its path & method, all in one go
+        argvs = []
+        for path in paths:
+            argvs += [('-a', self.app, 'pvDsetObjSel', str(path)),
+                      ('-s', self.app),
+                      ('-a', self.app, '-r', 'pvDsetPath', '-path', 'PROCNO'),
+                      ('-get', self.app, 'Method')]
+        self._Invalidate(['pvDsetObjSel'])
+        res = self.pv._run_pvcmds(argvs, strict=False)
+        for index in range(len(paths)):
+            _, _, procpath, method = res[4*index:4*index+4]
             try:
-                pvo = self.GetObj(index, restore=False)
-                # GetObj() succeeded, add object
-                if pvo in seen:
-                    break
-                #print 'GetObjList adding', pvo
-                seen += [pvo]
-                try:
-                    method = pvo.Method
-                except:
-                    method = ''
-                pvobjlist += [(index, pvo, method)]
-            except Exception, ex:
-                print 'GetObjList error', ex
+                pvo = PvObj(procpath, self)
+            except Exception as ex:
+                print(f'GetObjList error {ex}')
                 break
+            if pvo._objpath in seen:
+                break
+            seen.add(pvo._objpath)
+            pvobjlist.append(self._ObjEntry(pvo, method))
         self.SetObj(selection)
         return pvobjlist
     #...?
     # pvDsetListSubjects
     # pvDsetListStudies
-    # pvDsetListScans [ByName ById ByPath]
 
     def CreateStudy(self, **kwargs):
         ''' create a new study, return path '''
-        self.log.info('CreateStudy:' + str(kwargs))
+        self.log.info(f'CreateStudy:{kwargs}')
         if not len(kwargs['subjectid']):
             raise ValueError('PvCmd::CreateStudy: invalid (empty) subjectid')
-        # -studyname <name> -subjectid <id> -name <name> -subjectname <name> [ -birthdate YYYYMMDD ]
-        # [ -type (animal | human | other) ] [ -gender (f | m | u) ]
-        # [ -remarks <remarks> ] ] [ -studyloc <location> ]
-        # [ -coil <coil> ] [ -entry (FeetFirst | HeadFirst) ]
-        # [ -position (Supine | Prone | Left | Right) ] [ -weight <weight> ]
-        # [ -referral <referral> ] [ -purpose <purpose> ]
-        validkeys = ['studyname', 'subjectid', 'subjectname', 'birthdate', 'type', 'gender',
-                     'remarks', 'name', 'studyloc', 'coil', 'entry', 'position',
-                     'weight', 'referral', 'purpose']
-        args = []
-        for k, v in kwargs.items():
-            if k not in validkeys:
-                print 'CreateStudy: bad arg',k
-                continue
-            args += ['-'+k]
-            args += [str(v)]
-        #print 'CreateStudy',args
+        for k in kwargs:
+            if k not in _STUDY_KEYS:
+                print(f'CreateStudy: bad arg {k}')
+        args = [x for k, v in kwargs.items() if k in _STUDY_KEYS
+                for x in ('-'+k, str(v))]
         path = self.Command('pvDsetCreateStudy', *args)
+        _forget_listdirs()
         return path
 
     #def DeleteStudy(self, studyid):
@@ -478,90 +726,281 @@ class PvScan(PvApp):
         '''
         self.log.info('NewScan')
         self.Command('pvDsetSsel', 'New', protocolLoc, protocolName)
+        _forget_listdirs()
         return self.GetObj()
 
     # Reset commands
     # pvcmd -a pvScan pvResetInstrument
     # pvcmd -a pvScan pvResetParameterValues $pv::procnoDir
 
+# marks the end of one pvcmd's output on the _PvShell pipes
+_EOT = '\x04'
+# number of threads (and so _PvShells) for PvCmd._run_pvcmd_async
+_ASYNC_WORKERS = 4
+
+class PvResult(str):
+    '''
+    the (stripped) output of one pvcmd call
+
+    it's just a str, but it also remembers how it splits, for the replies
+    that get taken apart, like the list of apps from 'pvcmd -l'
+    '''
+    @cached_property
+    def lines(self):
+        return self.splitlines()
+
+    @cached_property
+    def words(self):
+        return self.split()
+
+class _PvShell(object):
+    '''
+    a long-lived /bin/sh coprocess that runs pvcmd command lines
+
+    pvcmd has no interactive mode, so rather than forking this python process
+    for every single get/set, the command lines are written to a shell that
+    stays around, and each command's output is framed by an EOT sentinel line
+    carrying a per-batch nonce.
+    '''
+    def __init__(self, pvcmd):
+        self._pvcmd = pvcmd
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._proc = subprocess.Popen(['/bin/sh'], shell=False, bufsize=-1,
+                                      stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE)
+
+    def close(self):
+        ''' end the shell, if it's running '''
+        with self._lock:
+            if self._proc is None:
+                return
+            self._proc.stdin.close()
+            try:
+                self._proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+            self._proc.stdout.close()
+            self._proc.stderr.close()
+            self._proc = None
+
+    def _drain(self, script, mark, nframes):
+        '''
+        feed 'script' to the shell while reading stdout & stderr together
+        until each has 'nframes' complete sentinels, so neither a long batch
+        nor a chatty stderr can block the shell while we wait on the other
+        pipe.  returns the raw (stdout, stderr) bytes.
+        '''
+        bufs = {self._proc.stdout.fileno(): bytearray(),
+                self._proc.stderr.fileno(): bytearray()}
+        pending = list(bufs)
+        script = memoryview(script)
+        towrite = [self._proc.stdin.fileno()] if script else []
+        while pending:
+            ready, writable, _ = select.select(pending, towrite, [])
+            if writable:
+                # no more than PIPE_BUF, so the write can't block
+                script = script[os.write(towrite[0], script[:select.PIPE_BUF]):]
+                if not script:
+                    towrite = []
+            for fd in ready:
+                data = os.read(fd, 65536)
+                if not data:
+                    raise ValueError(f"pvcmd shell exited: {bufs[fd].decode('utf-8', 'replace')}")
+                buf = bufs[fd]
+                buf += data
+                # done once the last sentinel's line is complete
+                if buf.count(mark) >= nframes and buf.rfind(b'\n') > buf.rfind(mark):
+                    pending.remove(fd)
+        return bufs[self._proc.stdout.fileno()], bufs[self._proc.stderr.fileno()]
+
+    @staticmethod
+    def _frames(buf, begin, mark, nframes):
+        '''
+        split the output of a batch into [(text, tag), ...], one per command,
+        raising ValueError if it isn't exactly what the batch should produce
+        '''
+        if not buf.startswith(begin):
+            raise ValueError(f"pvcmd shell out of step: {bytes(buf[:200])!r}")
+        frames = []
+        pos = len(begin)
+        for _ in range(nframes):
+            idx = buf.index(mark, pos)
+            end = buf.index(b'\n', idx + len(mark))
+            frames += [(buf[pos:idx].decode('utf-8', 'replace'),
+                        buf[idx + len(mark):end].decode('ascii'))]
+            pos = end + 1
+        if pos != len(buf):
+            raise ValueError(f"pvcmd shell out of step: {bytes(buf[pos:pos+200])!r}")
+        return frames
+
+    def run(self, argvs):
+        '''
+        run pvcmd once for each argument list in argvs, in order
+
+        returns [(returncode, stdout, stderr), ...]
+        '''
+        if not argvs:
+            return []
+        # a fresh tag per batch, so neither stray EOTs in pvcmd's output nor
+        # late output from an earlier batch can pass for our sentinels
+        nonce = os.urandom(6).hex()
+        begin = f'{_EOT}{nonce}<\n'
+        script = f"printf '{_EOT}{nonce}<\\n'; printf '{_EOT}{nonce}<\\n' >&2\n"
+        for argv in argvs:
+            script += ' '.join(shquote(str(a)) for a in [self._pvcmd] + list(argv))
+            script += f" </dev/null; printf '\\n{_EOT}{nonce} %d\\n' $?;"
+            script += f" printf '\\n{_EOT}{nonce} -\\n' >&2\n"
+        begin = begin.encode('ascii')
+        mark = f'\n{_EOT}{nonce} '.encode('ascii')
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            try:
+                out, err = self._drain(script.encode('utf-8'), mark, len(argvs))
+                outs = self._frames(out, begin, mark, len(argvs))
+                errs = self._frames(err, begin, mark, len(argvs))
+                results = [(int(rc), res, msg) for (res, rc), (msg, _) in zip(outs, errs)]
+            except:
+                # out of step with the shell, start over next time
+                self._proc.kill()
+                self._proc.wait()
+                self._proc = None
+                raise
+        return results
+
 class PvCmd(object):
     '''
     class for interacting with the whole ParaVision suite via the "pvcmd" utility
 
     attributes are the names of the applications that "pvcmd" can talk to
+
+    set 'concurrent' to let independent read-only queries run in parallel
+    pvcmd processes (needs concurrent.futures) - off by default, since PV
+    may well serialize them anyway.
+
+    close() it (or use it in a 'with' block) to end its pvcmd shells and threads.
     '''
 
+    # the only attributes that can be set, the rest are apps
+    _ALLOWED = frozenset(['_pvcmd', '_shells', '_pool', '_pvapps', 'XWINNMRHOME',
+                          'verbose', 'concurrent', 'log'])
+
     def __init__(self):
         self._pvcmd = ''
+        self._shells = collections.deque()
+        self._pool = None
         self._pvapps = dict()
         self.verbose = False
+        self.concurrent = False
         self.log = logging.getLogger('PvCmd')
 
         # find the pvcmd binary
         if 'XWINNMRHOME' in os.environ:
             self.XWINNMRHOME = os.environ['XWINNMRHOME']
         else:
-            print "warning, XWINNMRHOME not set, defaulting to /opt/PV5.1/"
+            print("warning, XWINNMRHOME not set, defaulting to /opt/PV5.1/")
             self.XWINNMRHOME = "/opt/PV5.1"
-        self.log.info('XWINNMRHOME:%s' % self.XWINNMRHOME)
+        self.log.info(f'XWINNMRHOME:{self.XWINNMRHOME}')
         self._pvcmd = self.XWINNMRHOME + "/prog/bin/scripts/pvcmd"
         if not is_exe(self._pvcmd):
             self._pvcmd = "./pvcmd.tester"
             self.log.warning('PvCmd using test harness')
             #raise EnvironmentError("no pvcmd or XWINNMRHOME not set")
         self.runningApps()
-        self.log.info('Apps:%s' % self._pvapps.keys())
+        self.log.info(f'Apps:{list(self._pvapps)}')
         if 'pvScan' in self._pvapps.keys():
             self._pvapps.pop('pvScan', None)
             self._pvapps['pvScan'] = PvScan(self)
         else:
-            print 'pvScan not in running apps:',self._pvapps.keys()
+            print(f'pvScan not in running apps: {list(self._pvapps)}')
             self.log.error('pvScan not in running apps')
-        #print "running apps:", self._pvapps.keys()
 
     def __setattr__(self, name, value):
-        if (name not in ['_pvcmd', '_pvapps', 'XWINNMRHOME', 'verbose', 'log']
-            and not hasattr(self, name)): # would this create a new attribute?
-            raise AttributeError("Creating new attribute '%s' is not allowed!" % name)
+        if name not in self._ALLOWED and name not in self.__dict__:
+            raise AttributeError(f"Creating new attribute '{name}' is not allowed!")
         super (PvCmd, self).__setattr__(name, value)
 
     def __getattr__(self, name):
-        return self._pvapps[name]
+        # via __dict__, in case _pvapps itself isn't set yet
+        pvapps = self.__dict__.get('_pvapps', {})
+        if name not in pvapps:
+            raise AttributeError(name)
+        app = pvapps[name]
+        if app is None:
+            # first use of this app
+            app = pvapps[name] = PvApp(name, self)
+        return app
 
     def _run_pvcmd(self, *args):
+        return self._run_pvcmds([args])[0]
+
+    def _run_pvcmd_async(self, *args):
+        ''' like _run_pvcmd, but returns a Future, run by a pool of threads '''
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=_ASYNC_WORKERS)
+        return self._pool.submit(self._run_pvcmd, *args)
+
+    def _run_pvcmds(self, argvs, strict=True):
+        '''
+        run several pvcmd invocations in a single round trip, return their results
+
+        if strict, the first failing invocation raises a ValueError, otherwise
+        failed invocations just give None in the returned list
+        '''
+        results = []
+        cmd = argvs
+        # take an idle shell, so that concurrent callers each have their own
         try:
-            cmd = [self._pvcmd]
-            cmd += args
-            self.log.debug('#%s' % str(cmd))
-            p = subprocess.Popen(cmd, shell=False,
-                                 stdin=subprocess.PIPE,
-                                 stdout=subprocess.PIPE,
-                                 stderr=subprocess.PIPE)
-            res, err = p.communicate(input='')
-            if self.verbose:
-                print 'pvcmd: ', str(cmd[1:]), '/', res, '/', err, '/', p.returncode
-            self.log.debug(' =%s/%s/%s.' % (res, err, p.returncode))
-            if p.returncode or len(err):
-                #print cmd, p.returncode
-                #print("OS error running pvcmd: %s".format(err))
-                raise ValueError("Error from pvcmd: %s" % (err))
-            #time.sleep(0.1)
-        except Exception, ex:
-            print 'exception:', ex
-            print cmd
-            raise ex
-        except ValueError, ex:
-            raise ex
-        #print res
-        return res.strip()
+            shell = self._shells.popleft()
+        except IndexError:
+            shell = _PvShell(self._pvcmd)
+        try:
+            for cmd, (returncode, res, err) in zip(argvs, shell.run(argvs)):
+                err = err.strip()
+                if self.verbose:
+                    print(f'pvcmd:  {cmd} / {res} / {err} / {returncode}')
+                self.log.debug(f'#{cmd} ={res}/{err}/{returncode}.')
+                if returncode or len(err):
+                    if strict:
+                        raise ValueError(f"Error from pvcmd: {err}")
+                    results += [None]
+                else:
+                    results += [PvResult(res.strip())]
+        except Exception as ex:
+            print(f'exception: {ex}')
+            print(cmd)
+            raise
+        finally:
+            self._shells.append(shell)
+        return results
 
     def runningApps(self):
-        appnames = self._run_pvcmd('-l').split()
+        appnames = self._run_pvcmd('-l').words
         for name in appnames:
-            self._pvapps[name] = PvApp(name, self)
+            # the PvApp is made when first used, see __getattr__
+            self._pvapps.setdefault(name, None)
         return self._pvapps.keys()
 
     def PVExit(self):
         ''' tell pv to exit '''
         self.pvCmd.Command('pvCmdExit')
 
+    def close(self):
+        ''' stop the worker threads and pvcmd shells, PV itself keeps running '''
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        while self._shells:
+            self._shells.popleft().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
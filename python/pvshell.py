@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 '''
 command line interface for paravision, or actually the PvCmd and PvObj
 classes.
@@ -26,6 +26,11 @@ class pvshell(cmd.Cmd):
         self.update_prompt()
         self.geom = {}
 
+    def precmd(self, line):
+        # PV may have changed since the last command (scans running, GUI clicks)
+        self.pv.pvScan.FlushCache()
+        return line
+
     def postcmd(self, stop, line):
         self.update_prompt()
         return stop
@@ -35,57 +40,57 @@ class pvshell(cmd.Cmd):
 
     def do_system(self, line):
         ''' print info about the current system '''
-        print "Institution:   ", self.pv.pvScan.GetParam('ACQ_institution')
-        print "System:        ", self.pv.pvScan.GetParam('ACQ_station')
-        print "PV version:    ", self.pv.pvScan.GetParam('ACQ_sw_version')
-        print "Status:        ", self.pv.pvScan.GetParam('ACQ_status')
-        print "Config Status: ", self.pv.pvScan.GetParam('CONFIG_status_string')
-        print "Shim Status:   ", self.pv.pvScan.GetParam('CONFIG_shim_status')
-        print "Instrument:    ", self.pv.pvScan.GetParam('CONFIG_instrument_type')
-        print "Max gradient:  ", self.pv.pvScan.GetParam('PVM_GradCalConst'), "Hz/mm"
+        print("Institution:   ", self.pv.pvScan.GetParam('ACQ_institution'))
+        print("System:        ", self.pv.pvScan.GetParam('ACQ_station'))
+        print("PV version:    ", self.pv.pvScan.GetParam('ACQ_sw_version'))
+        print("Status:        ", self.pv.pvScan.GetParam('ACQ_status'))
+        print("Config Status: ", self.pv.pvScan.GetParam('CONFIG_status_string'))
+        print("Shim Status:   ", self.pv.pvScan.GetParam('CONFIG_shim_status'))
+        print("Instrument:    ", self.pv.pvScan.GetParam('CONFIG_instrument_type'))
+        print("Max gradient:  ", self.pv.pvScan.GetParam('PVM_GradCalConst'), "Hz/mm")
 
     def do_ls(self, line):
-        ''' list available scans ? or something '''
+        ''' list the scans: expno (for cd), path, method '''
         objs = self.pv.pvScan.GetObjList()
         for iobj in objs:
-            print " ".join(str(x) for x in iobj)
+            print(" ".join(str(x) for x in iobj))
 
     def do_man(self, line):
         ''' get info about available commands '''
         if not len(line):
             # list all commands
-            print self.pv.pvScan.Command('CmdList')
+            print(self.pv.pvScan.Command('CmdList'))
         else:
             pass
 
     def do_info(self, line):
         ''' print some info about the current scan '''
         obj = self.pv.pvScan.GetObj()
-        print "Scan Method:   ", obj.Method
-        print "Scan Name:     ", obj.ACQ_scan_name
-        print "Scan Completed:", obj.ACQ_completed
-        print "Scan Duration: ", obj.PVM_ScanTimeStr
-        print "Reco Image:    ", obj.RECO_image_type
-        print "BF1:           ", obj.BF1
-        print "RG:            ", obj.RG
+        print("Scan Method:   ", obj.Method)
+        print("Scan Name:     ", obj.ACQ_scan_name)
+        print("Scan Completed:", obj.ACQ_completed)
+        print("Scan Duration: ", obj.PVM_ScanTimeStr)
+        print("Reco Image:    ", obj.RECO_image_type)
+        print("BF1:           ", obj.BF1)
+        print("RG:            ", obj.RG)
         refAtt = obj.PVM_RefAttCh1
         sp = Spectrometer()
         sp.SetCalibration(1000, refAtt)
-        print "RefAtt         ", sp._cal_dBW, ', Hz/V=',sp._cal_Hz_per_V
+        print("RefAtt         ", sp._cal_dBW, ', Hz/V=',sp._cal_Hz_per_V)
 
     def do_pwd(self, line):
         ''' print path of current Scan/Reco '''
-        print self.pv.pvScan.ProcPath()
+        print(self.pv.pvScan.ProcPath())
 
     def do_verbose(self, line):
         ''' print path of current Scan/Reco '''
         self.pv.verbose = not self.pv.verbose
-        print 'verbose=',self.pv.verbose
+        print('verbose=',self.pv.verbose)
 
     def do_rm(self, line):
         ''' remove a Scan/Reco '''
         obj = self.pv.pvScan.GetObj()
-        print 'deleting ', obj
+        print('deleting ', obj)
         obj.Delete()
     
     def do_study(self, line):
@@ -96,7 +101,7 @@ class pvshell(cmd.Cmd):
         if len(line):
             self.pv.pvScan.CreateStudy(*line.split(' '))
         else:
-            print self.pv.pvScan.StudyPath()
+            print(self.pv.pvScan.StudyPath())
     
     def do_clone(self, line):
         ''' clone the current object/scan '''
@@ -122,17 +127,17 @@ class pvshell(cmd.Cmd):
     def do_p(self, line):
         ''' print out the value of a parameter in the current obj/scan '''
         try:
-            print line, '=', self.pv.pvScan.GetObj().__getattr__(line)
-        except ValueError as ex:
-            print "'", line, "' not set."
+            print(line, '=', self.pv.pvScan.GetObj().__getattr__(line))
+        except (ValueError, AttributeError) as ex:
+            print("'", line, "' not set.")
 
     def do_set(self, line):
         ''' set the value of a parameter in the current obj/scan '''
         try:
             lines = line.split(" ")
             self.pv.pvScan.GetObj().__setattr__(lines[0], " ".join(lines[1:]))
-        except ValueError as ex:
-            print "'", line, "' not set:", ex
+        except (ValueError, AttributeError) as ex:
+            print("'", line, "' not set:", ex)
 
     def do_start(self, line):
         ''' traffic light (?) '''
@@ -162,16 +167,16 @@ class pvshell(cmd.Cmd):
         obj = self.pv.pvScan.GetObj()
         for pname in self.geompars:
             self.geom[pname] = obj.GetParam(pname)
-            print pname,'=',self.geom[pname]
+            print(pname,'=',self.geom[pname])
 
     def do_setgeom(self, line):
         ''' set the geometry of the current scan to that stored in the geom clipboard '''
         if not self.geom:
-            print 'must run "getgeom" before "setgeom"'
+            print('must run "getgeom" before "setgeom"')
             return
         obj = self.pv.pvScan.GetObj()
         for pname in self.geom.keys():
-            print 'setting',pname,'=',self.geom[pname]
+            print('setting',pname,'=',self.geom[pname])
             obj.SetParam(pname, self.geom[pname])
     
     def do_EOF(self, line):
@@ -197,7 +202,7 @@ if __name__ == '__main__':
         try:
             pvs.cmdloop()
         except (SystemExit, KeyboardInterrupt):
-            print
+            print()
             done = True
         except:
-            print traceback.print_exc()
+            traceback.print_exc()